@@ -1,17 +1,43 @@
+import hashlib
+from datetime import datetime
+
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
 
-from utils.display_utils import display_matrix_and_metrics
+from utils.display_utils import (
+    display_category_overview,
+    display_counts_and_metrics,
+    display_matrix_and_metrics,
+    display_model_comparison,
+    display_report,
+    display_report_export,
+    display_scan_stats,
+)
 from utils.generate_sample import generate_sample
+from utils.large_files import (
+    DATA_DIR,
+    LARGE_UPLOAD_BYTES,
+    clean_spool_dir_on_startup,
+    load_large_file,
+    resolve_local_path,
+    spool_upload,
+)
 from utils.logging_config import get_logger, setup_logging
+from utils.metrics import compute_category_counts, compute_category_metrics, compute_counts, compute_model_comparison
+from utils.out_of_core import read_preview, scan_confusion_counts
+from utils.report import Report, load_report_bundle
 from utils.scroll import scroll_to_column_config
 from utils.style import BETA_ZONE, MAIN_CSS, SIDEBAR_CSS
+from utils.warmup import log_first_render
 
 # Set up centralized logging configuration
 setup_logging()
 logger = get_logger(__name__)
 
+# Uploads spooled by a previous server process are never used again
+clean_spool_dir_on_startup()
+
 
 
 # Page configuration
@@ -36,6 +62,25 @@ file = sidebar.file_uploader(
     help="Upload a CSV or Excel file containing your predictions and ground truth data"
 )
 
+large_file_mode = sidebar.toggle(
+    '🗄️ Large-file mode',
+    help="Spool CSV uploads to disk and parse them in chunks, or read a CSV file from the mounted data volume"
+)
+local_path = None
+out_of_core = False
+if large_file_mode:
+    local_path = sidebar.text_input(
+        '📂 File on data volume',
+        placeholder="results/predictions.csv",
+        help=f"Path of a CSV file relative to {DATA_DIR}, used instead of uploading it",
+        # Entering a path replaces generated data, which otherwise takes precedence over it
+        on_change=lambda: st.session_state.pop('generated_data', None)
+    )
+    out_of_core = sidebar.toggle(
+        '💽 Evaluate out-of-core',
+        help="Scan the file from disk in batches instead of loading it in memory. Also accepts Parquet files and directories of shards"
+    )
+
 # Toggle button for fake data generation
 sidebar.markdown("---")
 button_text = "🎲 Generate fake data instead" if not st.session_state.get('show_fake_data_section', False) else "❌ Hide fake data options"
@@ -71,11 +116,19 @@ if st.session_state.show_fake_data_section:
     num_categories = sidebar.number_input(
         '🏷️ Number of categories',
         min_value=2,
-        max_value=20,
+        max_value=1000,
         value=5,
         step=1,
         help="Number of different categories to include in the dataset"
     )
+
+    seed = sidebar.number_input(
+        '🌱 Seed (optional)',
+        min_value=0,
+        value=None,
+        step=1,
+        help="Generate the same dataset every time for a given seed. Leave empty for random data"
+    )
     
     # Generate and load button
     generate_button = sidebar.button(
@@ -89,6 +142,7 @@ else:
     # Default values for when fake data section is not visible
     num_lines = 1000
     num_categories = 5
+    seed = None
 
 # Clear generated data button (only show if there's generated data)
 if 'generated_data' in st.session_state:
@@ -103,11 +157,19 @@ if 'generated_data' in st.session_state:
         st.success("✅ Generated data cleared!")
         st.rerun()
 
+# Saved report bundle, shown instead of computing metrics again
+sidebar.markdown("---")
+report_file = sidebar.file_uploader(
+    '📦 Open a saved report',
+    type=['zip'],
+    help="Display the results of a past run from its exported report bundle"
+)
+
 # Handle fake data generation
 if generate_button:
     logger.info(f"Generating fake dataset with {num_lines:,} rows and {num_categories} categories")
     with st.spinner(f'🔄 Generating fake dataset of {num_lines:,} rows with {num_categories} categories...'):
-        df = generate_sample(sample_size=num_lines, nb_categories=num_categories)
+        df = generate_sample(sample_size=num_lines, nb_categories=num_categories, seed=seed)
         st.session_state['generated_data'] = df
         st.session_state['should_scroll_to_config'] = True
     logger.info("Fake data generated successfully")
@@ -115,22 +177,48 @@ if generate_button:
 # Check if we have generated data or uploaded file
 df = None
 data_source = None
+# CSV file only previewed for now, whose selected columns are loaded when computing metrics
+large_file_path = None
+# Dataset on the data volume scanned from disk when computing metrics
+dataset_path = None
+# Data hashed into exported reports, or its hash when it's already known
+report_source = None
+source_hash = None
 
 # Handle generated data
 if 'generated_data' in st.session_state:
     df = st.session_state['generated_data']
     data_source = "Generated Data"
+    report_source = df
+
+# Remove the spooled copy of an upload as soon as it is no longer used
+large_upload = file is not None and file.name.endswith('.csv') and (large_file_mode or file.size > LARGE_UPLOAD_BYTES)
+spooled = st.session_state.get('spooled_upload')
+if spooled is not None and (not large_upload or spooled[0] != (file.name, file.size, file.file_id)):
+    spooled[1].unlink(missing_ok=True)
+    del st.session_state['spooled_upload']
 
 # Handle uploaded file
 if file is not None:
     logger.info(f"Processing uploaded file: {file.name}")
     try:
-        if file.name.endswith('.csv'):
+        if large_upload:
+            logger.info("Reading CSV file through the large-file path")
+            if 'spooled_upload' not in st.session_state:
+                st.session_state['spooled_upload'] = ((file.name, file.size, file.file_id), spool_upload(file))
+            large_file_path = st.session_state['spooled_upload'][1]
+            # Only a preview is loaded until the columns to keep are selected
+            df = read_preview(large_file_path)
+            # Spooled copy hashed by the background export job
+            report_source = large_file_path
+        elif file.name.endswith('.csv'):
             logger.info("Reading CSV file")
             df = pd.read_csv(file)
+            report_source = None
         else:
             logger.info("Reading Excel file")
             df = pd.read_excel(file)
+            report_source = None
         data_source = "Uploaded File"
         # Clear any previously generated data when file is uploaded
         if 'generated_data' in st.session_state:
@@ -141,7 +229,48 @@ if file is not None:
         st.info("💡 Please ensure your data has the correct format and that columns are properly selected in Column Configuration.")
         df = None
 
-if df is not None:
+# Handle file from the mounted data volume
+# Out-of-core evaluation only applies to files on the data volume, not to uploads or generated data
+out_of_core = out_of_core and file is None and bool(local_path) and 'generated_data' not in st.session_state
+if file is None and local_path and 'generated_data' not in st.session_state:
+    logger.info(f"Processing local file: {local_path}")
+    try:
+        path = resolve_local_path(local_path, allow_dataset=out_of_core)
+        # Only a preview is loaded: metrics are computed by scanning the dataset,
+        # or from its selected columns only
+        df = read_preview(path)
+        if out_of_core:
+            dataset_path = path
+        else:
+            large_file_path = path
+        data_source = "Local File"
+        report_source = path
+        if st.session_state.get('loaded_local_path') != str(path):
+            st.session_state['loaded_local_path'] = str(path)
+            st.session_state['should_scroll_to_config'] = True
+    except (ValueError, ImportError) as e:
+        logger.error(f"Invalid local file: {e}")
+        st.error(f"❌ **Cannot read local file**: {e}")
+        df = None
+
+saved_report = None
+if report_file is not None and df is None:
+    logger.info(f"Loading saved report: {report_file.name}")
+    try:
+        saved_report = load_report_bundle(report_file)
+        if st.session_state.get('loaded_report_id') != report_file.file_id:
+            # Row selected in the overview of a previous report
+            st.session_state['loaded_report_id'] = report_file.file_id
+            st.session_state.pop('report_overview', None)
+    except ValueError as e:
+        logger.error(f"Invalid report bundle: {e}")
+        st.error(f"❌ **Cannot read report bundle**: {e}")
+
+if saved_report is not None:
+    st.markdown("## 📦 **Saved Report**")
+    display_report(saved_report)
+
+elif df is not None:
     # Column selection with enhanced UI
     sidebar.markdown("---")
     sidebar.markdown('<div id="column-config-anchor"></div>', unsafe_allow_html=True)
@@ -172,17 +301,29 @@ if df is not None:
         columns,
         help="Select the column containing the model's predictions"
     )
+
+    compare_mode = sidebar.toggle(
+        '🆚 Compare models',
+        disabled=out_of_core,
+        help="Compare several prediction columns against the same ground truth"
+    )
+    # A disabled toggle keeps its value: out-of-core datasets are only previewed, never compared
+    compare_mode = compare_mode and not out_of_core
+    if compare_mode:
+        compared_cols = sidebar.multiselect(
+            '🎯 Predicted Values Columns to Compare',
+            columns,
+            default=[pred_col],
+            help="Select at least two columns containing predictions of different models"
+        )
+    else:
+        compared_cols = []
     
     category_col = sidebar.selectbox(
         '📂 Category Column (Optional)', 
         ['None'] + columns,
         help="Select a category column to analyze results by different groups"
     )
-    if category_col != 'None':
-        selected_cats = sorted(df[category_col].unique()) 
-    else:
-        selected_cats = None
-
 
     # Beta parameter with enhanced styling
     sidebar.markdown("---")
@@ -215,6 +356,13 @@ if df is not None:
                 <small>Sample data loaded and ready for analysis</small>
             </div>
             """, unsafe_allow_html=True)
+        elif data_source == "Local File":
+            st.markdown("""
+            <div class='success-box'>
+                ✅ <strong>Local file loaded successfully!</strong><br>
+                <small>Data read from the mounted volume and ready for analysis</small>
+            </div>
+            """, unsafe_allow_html=True)
         else:
             st.markdown("""
             <div class='success-box'>
@@ -230,18 +378,110 @@ if df is not None:
                 use_container_width=True,
                 hide_index=True
             )
-            st.caption(f"📈 Dataset contains **{len(df):,}** rows and **{len(df.columns)}** columns")
+            if out_of_core:
+                st.caption(f"📈 Preview of the first **{len(df):,}** rows and **{len(df.columns)}** columns: the whole dataset is scanned from disk when computing metrics")
+            elif large_file_path is not None:
+                st.caption(f"📈 Preview of the first **{len(df):,}** rows and **{len(df.columns)}** columns: only the selected columns are loaded when computing metrics")
+            else:
+                st.caption(f"📈 Dataset contains **{len(df):,}** rows and **{len(df.columns)}** columns")
 
     if compute_button:
         # Store computed state in session
         logger.info("Computing metrics...")
+        if large_file_path is not None:
+            usecols = list(dict.fromkeys([truth_col, pred_col, *compared_cols] + ([] if category_col == 'None' else [category_col])))
+            try:
+                with st.spinner("🗄️ Loading selected columns from disk..."):
+                    df = load_large_file(large_file_path, usecols)
+            except ValueError as e:
+                logger.error(f"Error loading large file: {e}")
+                st.error(f"❌ **Cannot load file**: {e}")
+                st.stop()
         st.session_state['metrics_computed'] = True
         st.session_state['df_computed'] = df
         st.session_state['truth_col_computed'] = truth_col
         st.session_state['pred_col_computed'] = pred_col
         st.session_state['beta_computed'] = beta
         st.session_state['category_col_computed'] = category_col
-        st.session_state['selected_cats_computed'] = selected_cats
+        # Categories are listed from their counts once computed
+        st.session_state['selected_cats_computed'] = None
+        st.session_state.pop('category_counts_computed', None)
+        st.session_state.pop('scan_computed', None)
+        st.session_state.pop('comparison_computed', None)
+        st.session_state.pop('report_future', None)
+        # Row selected in the overview of the previous computation
+        st.session_state.pop('category_overview', None)
+        compute_start = datetime.now()
+        if compare_mode and len(compared_cols) >= 2:
+            # All models are counted in one pass, optionally per category
+            try:
+                with st.spinner(f"🔄 Comparing {len(compared_cols)} models..."):
+                    st.session_state['comparison_computed'] = compute_model_comparison(
+                        df, truth_col, compared_cols, None if category_col == 'None' else category_col
+                    )
+            except ValueError as e:
+                logger.error(f"Error comparing models: {e}")
+                st.session_state['metrics_computed'] = False
+                st.error("❌ Error computing metrics: please ensure you have correctly configured the 'ground truth' and 'predicted' columns.")
+                st.stop()
+        elif compare_mode:
+            st.session_state['metrics_computed'] = False
+            st.warning("⚠️ Select at least two prediction columns to compare models.")
+            st.stop()
+        elif dataset_path is not None:
+            # Scan the dataset once: overview, drill-downs and reruns all reuse its counts
+            try:
+                with st.spinner("💽 Scanning dataset from disk..."):
+                    scan = scan_confusion_counts(dataset_path, truth_col, pred_col, None if category_col == 'None' else category_col)
+                st.session_state['scan_computed'] = scan
+                st.session_state['counts_computed'] = scan.counts
+                if scan.category_counts is not None:
+                    st.session_state['category_counts_computed'] = scan.category_counts
+                    st.session_state['selected_cats_computed'] = scan.category_counts.index.tolist()
+            except (ValueError, ImportError) as e:
+                logger.error(f"Error scanning dataset: {e}")
+                st.session_state['metrics_computed'] = False
+                st.error("❌ Error computing metrics: please ensure you have correctly configured the 'ground truth' and 'predicted' columns.")
+                st.stop()
+        elif category_col != 'None':
+            # Count every category once so the overview and drill-downs don't go back to the rows
+            try:
+                with st.spinner("🔄 Aggregating metrics per category..."):
+                    st.session_state['category_counts_computed'] = compute_category_counts(df, truth_col, pred_col, category_col)
+                    # Overall counts come from all rows: grouping drops rows without a category
+                    st.session_state['counts_computed'] = compute_counts(df, truth_col, pred_col)
+                st.session_state['selected_cats_computed'] = st.session_state['category_counts_computed'].index.tolist()
+            except ValueError as e:
+                logger.error(f"Error computing category counts: {e}")
+                st.session_state['metrics_computed'] = False
+                st.error("❌ Error computing metrics: please ensure you have correctly configured the 'ground truth' and 'predicted' columns.")
+                st.stop()
+        else:
+            # Overall counts are only kept for exports: the results below are computed from the rows
+            try:
+                st.session_state['counts_computed'] = compute_counts(df, truth_col, pred_col)
+            except ValueError as e:
+                logger.error(f"Error computing counts: {e}")
+                st.session_state['metrics_computed'] = False
+                st.error("❌ Error computing metrics: please ensure you have correctly configured the 'ground truth' and 'predicted' columns.")
+                st.stop()
+
+        if file is not None and report_source is None:
+            # Small in-memory upload (below LARGE_UPLOAD_BYTES): hash it now rather than
+            # keeping a reference to it for the export
+            source_hash = hashlib.sha256(file.getbuffer()).hexdigest()
+        st.session_state['report_source_computed'] = report_source
+        st.session_state['report_metadata_computed'] = {
+            "data_source": data_source,
+            "source_name": file.name if file is not None else (local_path or data_source),
+            **({"source_sha256": source_hash} if source_hash else {}),
+            "columns": {
+                "truth": truth_col,
+                "prediction": pred_col,
+                "category": None if category_col == 'None' else category_col,
+            },
+            "timings": {"compute_seconds": (datetime.now() - compute_start).total_seconds()},
+        }
 
     # Show results if metrics have been computed
     if st.session_state.get('metrics_computed', False):
@@ -258,31 +498,47 @@ if df is not None:
         logger.info(f"Using category column: {category_col_stored}")
         selected_cats_stored = st.session_state['selected_cats_computed']
         logger.info(f"Selected categories: {selected_cats_stored}")
+        scan_stored = st.session_state.get('scan_computed')
+        comparison_stored = st.session_state.get('comparison_computed')
         
-        if category_col_stored != 'None' and selected_cats_stored:
+        if comparison_stored is not None:
+            st.markdown("## 🆚 **Model Comparison Results**")
+            display_model_comparison(comparison_stored, beta_stored)
+        elif category_col_stored != 'None' and selected_cats_stored:
             st.markdown("## 📊 **Category-wise Analysis Results**")
             
-            # Create a selectbox for category selection
-            category_options = ["📈 All Categories"] + [f"📂 {cat}" for cat in selected_cats_stored]
-            selected_category = st.selectbox(
-                "🔍 **Select Category to Analyze:**",
-                options=category_options,
-                index=0,
-                help="Choose which category to analyze. Select 'All Categories' for overall results.",
-                key="category_selector"
-            )
+            category_counts = st.session_state['category_counts_computed']
+            category_metrics = compute_category_metrics(category_counts, beta_stored)
+            if scan_stored is not None:
+                display_scan_stats(scan_stored.stats)
+
+            st.markdown("### 📋 **All Categories Overview**")
+            selected_category = display_category_overview(category_metrics, beta_stored)
             logger.info(f"Selected category for analysis: {selected_category}")
             # Display results based on selection
-            if selected_category == "📈 All Categories":
-                display_matrix_and_metrics(df_stored, truth_col_stored, pred_col_stored, beta_stored, "All Categories")
+            if selected_category is None:
+                st.markdown("### 📈 **All Categories**")
+                display_counts_and_metrics(st.session_state['counts_computed'], beta_stored, "All Categories")
             else:
-                # Extract category name (remove emoji prefix)
-                cat_name = selected_category.replace("📂 ", "")
-                filtered = df_stored[df_stored[category_col_stored] == cat_name]
-                display_matrix_and_metrics(filtered, truth_col_stored, pred_col_stored, beta_stored, cat_name)
+                st.markdown(f"### 📂 **{selected_category}**")
+                display_counts_and_metrics(category_counts.loc[selected_category], beta_stored, selected_category)
         else:
             st.markdown("## 📊 **Overall Classification Results**")
-            display_matrix_and_metrics(df_stored, truth_col_stored, pred_col_stored, beta_stored)
+            if scan_stored is not None:
+                display_scan_stats(scan_stored.stats)
+                display_counts_and_metrics(scan_stored.counts, beta_stored)
+            else:
+                display_matrix_and_metrics(df_stored, truth_col_stored, pred_col_stored, beta_stored)
+
+        if comparison_stored is None:
+            # Exports are built from the cached counts, without going back to the rows
+            report = Report(
+                counts=st.session_state['counts_computed'],
+                category_counts=st.session_state.get('category_counts_computed'),
+                beta=beta_stored,
+                metadata=st.session_state['report_metadata_computed']
+            )
+            display_report_export(report, st.session_state['report_source_computed'])
 
 else:
     # Add description when no file is uploaded
@@ -320,3 +576,5 @@ else:
     - **📊 Key Metrics** - Precision, Recall, and F-β scores
     - **📂 Category Analysis** - Detailed breakdown by different groups
     """)
+
+log_first_render()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import binomtest, chi2
+from sklearn.metrics import confusion_matrix, fbeta_score, precision_score, recall_score
+
+from utils.metrics import binary_metrics_from_counts, compute_counts, compute_model_comparison, mcnemar_test
+
+
+@pytest.mark.parametrize("beta", [0.5, 1.0, 2.0])
+@pytest.mark.parametrize(
+    "y_true, y_pred",
+    [
+        (np.random.default_rng(0).integers(0, 2, 200), np.random.default_rng(1).integers(0, 2, 200)),
+        # Degenerate cases hitting sklearn's zero_division
+        ([0, 0, 1, 1], [0, 0, 0, 0]),
+        ([0, 0, 0, 0], [0, 1, 0, 1]),
+        ([0, 0, 0, 0], [0, 0, 0, 0]),
+    ],
+)
+def test_binary_metrics_from_counts_matches_sklearn(y_true, y_pred, beta):
+    (tn, fp), (fn, tp) = confusion_matrix(y_true, y_pred, labels=[0, 1])
+    result = binary_metrics_from_counts(tn, fp, fn, tp, beta)
+
+    assert result.confusion_matrix == [[tn, fp], [fn, tp]]
+    assert result.precision == pytest.approx(precision_score(y_true, y_pred, zero_division=0))
+    assert result.recall == pytest.approx(recall_score(y_true, y_pred, zero_division=0))
+    assert result.fbeta_score == pytest.approx(fbeta_score(y_true, y_pred, beta=beta, zero_division=0))
+
+
+@pytest.mark.parametrize("only_a_correct, only_b_correct", [(1, 5), (7, 3), (4, 4), (0, 12), (12, 12)])
+def test_mcnemar_exact(only_a_correct, only_b_correct):
+    statistic, p_value = mcnemar_test(only_a_correct, only_b_correct)
+
+    assert statistic == min(only_a_correct, only_b_correct)
+    expected = binomtest(min(only_a_correct, only_b_correct), only_a_correct + only_b_correct, 0.5).pvalue
+    assert p_value == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("only_a_correct, only_b_correct", [(10, 25), (40, 20), (13, 12), (100, 0)])
+def test_mcnemar_chi_squared(only_a_correct, only_b_correct):
+    statistic, p_value = mcnemar_test(only_a_correct, only_b_correct)
+
+    expected_statistic = (abs(only_a_correct - only_b_correct) - 1) ** 2 / (only_a_correct + only_b_correct)
+    assert statistic == pytest.approx(expected_statistic)
+    assert p_value == pytest.approx(chi2.sf(expected_statistic, df=1))
+
+
+def test_mcnemar_without_discordant_samples():
+    assert mcnemar_test(0, 0) == (0.0, 1.0)
+
+
+def test_model_comparison_counts_rows_without_category():
+    df = pd.DataFrame({
+        "category": ["A", None, "B", "A", "B", None],
+        "truth": [0, 1, 1, 0, 1, 0],
+        "model_1": [0, 1, 0, 0, 1, 1],
+        "model_2": [1, 1, 1, 0, 0, 0],
+    })
+
+    comparison = compute_model_comparison(df, "truth", ["model_1", "model_2"], "category")
+
+    for model in ["model_1", "model_2"]:
+        expected = compute_counts(df, "truth", model)
+        assert comparison.overall_counts.loc[model].tolist() == expected.tolist()
+    # model_1 is right and model_2 wrong on rows 0 and 4, the other way around on rows 2 and 5
+    assert comparison.discordant.loc["model_1", "model_2"] == 2
+    assert comparison.discordant.loc["model_2", "model_1"] == 2
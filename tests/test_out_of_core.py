@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.metrics import compute_category_counts, compute_counts
+from utils.out_of_core import scan_confusion_counts
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    size = 1000
+    category = rng.choice(["A", "B", "C"], size=size).astype(object)
+    # Rows without a category are counted overall but in no category
+    category[rng.random(size) < 0.1] = np.nan
+    return pd.DataFrame({
+        "category": category,
+        "truth": rng.integers(0, 2, size),
+        "pred": rng.integers(0, 2, size),
+    })
+
+
+def _write(df: pd.DataFrame, path):
+    if path.suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+        df.to_parquet(path, index=False, row_group_size=300)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+@pytest.mark.parametrize("categorical", [False, True])
+def test_scan_matches_in_memory_counts(df, tmp_path, file_format, categorical):
+    if categorical:
+        # Unobserved categories shouldn't get a row
+        df["category"] = pd.Categorical(df["category"], categories=["A", "B", "C", "D"])
+    path = _write(df, tmp_path / f"data.{file_format}")
+
+    scan = scan_confusion_counts(path, "truth", "pred", "category", batch_size=128)
+
+    pd.testing.assert_series_equal(scan.counts, compute_counts(df, "truth", "pred").astype("int64"))
+    expected = compute_category_counts(df, "truth", "pred", "category").astype("int64")
+    pd.testing.assert_frame_equal(scan.category_counts, expected, check_index_type=False, check_categorical=False)
+    assert scan.stats.rows_scanned == len(df)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_scan_directory_of_shards(df, tmp_path, file_format):
+    for i, start in enumerate(range(0, len(df), 400)):
+        _write(df.iloc[start:start + 400], tmp_path / f"part-{i:05d}.{file_format}")
+
+    scan = scan_confusion_counts(tmp_path, "truth", "pred", "category")
+
+    pd.testing.assert_series_equal(scan.counts, compute_counts(df, "truth", "pred").astype("int64"))
+    expected = compute_category_counts(df, "truth", "pred", "category").astype("int64")
+    pd.testing.assert_frame_equal(scan.category_counts, expected)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_scan_filters_categories_of_the_column_type(df, tmp_path, file_format):
+    df["category"] = df["category"].map({"A": 1, "B": 2, "C": 3}).fillna(0).astype("int64")
+    path = _write(df, tmp_path / f"data.{file_format}")
+
+    # Categories given as strings, like from the command line
+    scan = scan_confusion_counts(path, "truth", "pred", "category", categories=["1", "3"])
+
+    kept = df[df["category"].isin([1, 3])]
+    pd.testing.assert_series_equal(scan.counts, compute_counts(kept, "truth", "pred").astype("int64"))
+    assert scan.category_counts.index.tolist() == [1, 3]
+
+
+def test_scan_rejects_categories_of_another_type(df, tmp_path):
+    df["category"] = 1
+    path = _write(df, tmp_path / "data.csv")
+
+    with pytest.raises(ValueError):
+        scan_confusion_counts(path, "truth", "pred", "category", categories=["A"])
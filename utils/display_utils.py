@@ -1,11 +1,21 @@
 from datetime import datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 from .logging_config import get_logger
-from .metrics import BinaryMetricsResult, compute_binary_metrics
+from .metrics import (
+    BinaryMetricsResult,
+    ModelComparison,
+    binary_metrics_from_counts,
+    compare_models_mcnemar,
+    compute_binary_metrics,
+    compute_category_metrics,
+)
+from .out_of_core import ScanStats, scan_confusion_counts
 from .plots import plot_confusion_matrix
+from .report import Report, submit_report_bundle
 
 logger = get_logger(__name__)
 
@@ -41,114 +51,308 @@ def create_metric_card(title: str, value: float | int, color: str, description:
     """
 
 
-def display_matrix_and_metrics(filtered: pd.DataFrame, truth_col: str, pred_col: str, beta: float, category: str | None = None):
-    """Display confusion matrix and metrics with enhanced professional styling."""
+def display_matrix_and_metrics(
+    filtered: pd.DataFrame | Path,
+    truth_col: str,
+    pred_col: str,
+    beta: float,
+    category: str | None = None,
+    category_col: str | None = None
+):
+    """
+    Display confusion matrix and metrics with enhanced professional styling.
+
+    `filtered` is either the DataFrame to evaluate, or the path of a CSV/Parquet dataset
+    which is scanned from disk without being loaded. In the latter case, giving
+    `category_col` restricts the scan to `category`.
+    """
     logger.info("Displaying matrix and metrics")
     with st.spinner("🔄 Calculating metrics and generating visualizations..."):
         try:
             start = datetime.now()
             logger.info("Computing metrics...")
-            result: BinaryMetricsResult = compute_binary_metrics(filtered[truth_col], filtered[pred_col], beta)
+            if isinstance(filtered, Path):
+                categories = [category] if category_col and category is not None else None
+                scan = scan_confusion_counts(filtered, truth_col, pred_col, category_col if categories else None, categories)
+                counts = scan.counts
+                result = binary_metrics_from_counts(counts["tn"], counts["fp"], counts["fn"], counts["tp"], beta)
+            else:
+                scan = None
+                result: BinaryMetricsResult = compute_binary_metrics(filtered[truth_col], filtered[pred_col], beta)
             logger.info(f"Metrics computed successfully in {(datetime.now() - start).total_seconds():.2f} seconds")
         except ValueError as e:
             logger.error(f"Error computing metrics: {e}")
             st.error("❌ Error computing metrics: please ensure you have correctly configured the 'ground truth' and 'predicted' columns.")
             st.stop()
+        if scan is not None:
+            display_scan_stats(scan.stats)
+        display_result(result, beta)
+
+
+def display_scan_stats(stats: ScanStats):
+    """Display how much data an out-of-core scan read from disk."""
+    total = stats.bytes_scanned + stats.bytes_skipped
+    skipped_share = stats.bytes_skipped / total if total else 0.0
+    st.caption(
+        f"💽 Out-of-core scan: **{stats.rows_scanned:,}** rows in **{stats.batches}** batches, "
+        f"**{stats.bytes_scanned / 1024 ** 2:,.1f} MB** scanned, "
+        f"**{stats.bytes_skipped / 1024 ** 2:,.1f} MB** skipped ({skipped_share:.0%})"
+    )
+
+
+def display_counts_and_metrics(counts: pd.Series, beta: float, category: str | None = None):
+    """Display confusion matrix and metrics from already aggregated confusion counts."""
+    logger.info(f"Displaying matrix and metrics from counts for {category or 'all samples'}")
+    result = binary_metrics_from_counts(counts["tn"], counts["fp"], counts["fn"], counts["tp"], beta)
+    display_result(result, beta)
+
+
+def display_result(result: BinaryMetricsResult, beta: float):
+    """Display the confusion matrix and metric cards of a computed result."""
+    # Main content in two equal columns
+    metrics_column, confusion_matrix_column = st.columns([1, 1], gap="large")
+    
+    with confusion_matrix_column:
         
-        # Main content in two equal columns
-        metrics_column, confusion_matrix_column = st.columns([1, 1], gap="large")
+        # Enhanced confusion matrix
+        logger.info("Plotting confusion matrix plot")
+        fig = plot_confusion_matrix(result.confusion_matrix, [0, 1])
+        st.pyplot(fig, use_container_width=True)
         
-        with confusion_matrix_column:
-            
-            # Enhanced confusion matrix
-            logger.info("Plotting confusion matrix plot")
-            fig = plot_confusion_matrix(result.confusion_matrix, [0, 1])
-            st.pyplot(fig, use_container_width=True)
-            
-            # Confusion matrix interpretation
-            cm = result.confusion_matrix
-            tn, fp, fn, tp = cm[0][0], cm[0][1], cm[1][0], cm[1][1]
-            
-            st.markdown("### 📋 **Matrix Breakdown**")
-            
-            # Create a small interpretation table
-            matrix_data = {
-                "Metric": ["True Negatives (TN)", "False Positives (FP)", "False Negatives (FN)", "True Positives (TP)"],
-                "Count": [int(tn), int(fp), int(fn), int(tp)],
-                "Description": [
-                    "Correctly rejected (predicted as wrong category)",
-                    "Incorrectly accepted (predicted as good category)", 
-                    "Incorrectly rejected (predicted as wrong category)",
-                    "Correctly accepted (predicted as good category)"
-                ]
+        # Confusion matrix interpretation
+        cm = result.confusion_matrix
+        tn, fp, fn, tp = cm[0][0], cm[0][1], cm[1][0], cm[1][1]
+        
+        st.markdown("### 📋 **Matrix Breakdown**")
+        
+        # Create a small interpretation table
+        matrix_data = {
+            "Metric": ["True Negatives (TN)", "False Positives (FP)", "False Negatives (FN)", "True Positives (TP)"],
+            "Count": [int(tn), int(fp), int(fn), int(tp)],
+            "Description": [
+                "Correctly rejected (predicted as wrong category)",
+                "Incorrectly accepted (predicted as good category)", 
+                "Incorrectly rejected (predicted as wrong category)",
+                "Correctly accepted (predicted as good category)"
+            ]
+        }
+        
+        matrix_df = pd.DataFrame(matrix_data)
+        logger.info("Displaying confusion matrix DataFrame")
+        st.dataframe(
+            matrix_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Metric": st.column_config.TextColumn("Metric", width="medium"),
+                "Count": st.column_config.NumberColumn("Count", width="small"),
+                "Description": st.column_config.TextColumn("Description", width="large")
             }
+        )
+    
+    with metrics_column:
+        logger.info("Creating metrics cards")
+        # Sample count card (full width)
+        total_samples = int(tn + fp + fn + tp)
+        accuracy = (tp + tn) / total_samples if total_samples else 0.0
+        
+        sample_count_html = create_metric_card(
+            "Sample Count", 
+            total_samples, 
+            "#34495e",
+            "Total number of samples analyzed"
+        )
+        st.markdown(sample_count_html, unsafe_allow_html=True)
+        
+        # 2x2 grid of metric cards
+        metric_col1, metric_col2 = st.columns(2, gap="small")
+        
+        with metric_col1:
+            accuracy_html = create_metric_card(
+                "Accuracy", 
+                accuracy, 
+                "#f39c12",
+                "Correctly classified",
+                format_as_percentage=True
+            )
+            st.markdown(accuracy_html, unsafe_allow_html=True)
             
-            matrix_df = pd.DataFrame(matrix_data)
-            logger.info("Displaying confusion matrix DataFrame")
-            st.dataframe(
-                matrix_df,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Metric": st.column_config.TextColumn("Metric", width="medium"),
-                    "Count": st.column_config.NumberColumn("Count", width="small"),
-                    "Description": st.column_config.TextColumn("Description", width="large")
-                }
+            recall_html = create_metric_card(
+                "Recall", 
+                result.recall, 
+                "#3498db", 
+                "Of actual positives found",
+                format_as_percentage=True
             )
+            st.markdown(recall_html, unsafe_allow_html=True)
         
-        with metrics_column:
-            logger.info("Creating metrics cards")
-            # Sample count card (full width)
-            total_samples = len(filtered)
-            accuracy = (tp + tn) / total_samples
-            
-            sample_count_html = create_metric_card(
-                "Sample Count", 
-                total_samples, 
-                "#34495e",
-                "Total number of samples analyzed"
+        with metric_col2:
+            precision_html = create_metric_card(
+                "Precision", 
+                result.precision, 
+                "#2ecc71",
+                "Of predicted positives correct",
+                format_as_percentage=True
             )
-            st.markdown(sample_count_html, unsafe_allow_html=True)
-            
-            # 2x2 grid of metric cards
-            metric_col1, metric_col2 = st.columns(2, gap="small")
-            
-            with metric_col1:
-                accuracy_html = create_metric_card(
-                    "Accuracy", 
-                    accuracy, 
-                    "#f39c12",
-                    "Correctly classified",
-                    format_as_percentage=True
-                )
-                st.markdown(accuracy_html, unsafe_allow_html=True)
-                
-                recall_html = create_metric_card(
-                    "Recall", 
-                    result.recall, 
-                    "#3498db", 
-                    "Of actual positives found",
-                    format_as_percentage=True
-                )
-                st.markdown(recall_html, unsafe_allow_html=True)
+            st.markdown(precision_html, unsafe_allow_html=True)
             
-            with metric_col2:
-                precision_html = create_metric_card(
-                    "Precision", 
-                    result.precision, 
-                    "#2ecc71",
-                    "Of predicted positives correct",
-                    format_as_percentage=True
-                )
-                st.markdown(precision_html, unsafe_allow_html=True)
-                
-                fbeta_html = create_metric_card(
-                    f"F{beta:.1f}-Score", 
-                    result.fbeta_score, 
-                    "#9b59b6",
-                    f"Balanced metric (β={beta:.1f})",
-                    format_as_percentage=True
-                )
-                st.markdown(fbeta_html, unsafe_allow_html=True)
-            logger.info("Metrics cards created successfully")
-        st.markdown("---")
\ No newline at end of file
+            fbeta_html = create_metric_card(
+                f"F{beta:.1f}-Score", 
+                result.fbeta_score, 
+                "#9b59b6",
+                f"Balanced metric (β={beta:.1f})",
+                format_as_percentage=True
+            )
+            st.markdown(fbeta_html, unsafe_allow_html=True)
+        logger.info("Metrics cards created successfully")
+    st.markdown("---")
+
+def _percentage_column(label: str):
+    """Column configuration showing a 0-1 metric as a percentage bar."""
+    return st.column_config.ProgressColumn(label, min_value=0.0, max_value=1.0, format="percent")
+
+
+def display_category_overview(category_metrics: pd.DataFrame, beta: float, key: str = "category_overview") -> str | None:
+    """
+    Display a sortable overview table of the metrics of every category.
+
+    Args:
+        category_metrics: DataFrame indexed by category, as returned by `compute_category_metrics`
+        beta: Beta value used for the f-beta score
+        key: Widget key of the table, whose selection should be cleared when its categories change
+
+    Returns:
+        Category of the row selected by the user, or None if no row is selected
+    """
+    logger.info(f"Displaying overview of {len(category_metrics)} categories")
+    overview = category_metrics.rename_axis("category").reset_index()
+    event = st.dataframe(
+        overview,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=key,
+        column_config={
+            "category": st.column_config.TextColumn("Category", width="medium"),
+            "samples": st.column_config.NumberColumn("Sample Count", format="localized"),
+            "precision": _percentage_column("Precision"),
+            "recall": _percentage_column("Recall"),
+            "fbeta_score": _percentage_column(f"F{beta:.1f}-Score"),
+            "accuracy": _percentage_column("Accuracy"),
+        }
+    )
+    st.caption("💡 Click a column header to sort, use the search icon to filter, and select a row to drill into its confusion matrix.")
+    selected_rows = event.selection.rows
+    # The selection of a table showing other categories may outlive them
+    if not selected_rows or selected_rows[0] >= len(overview):
+        return None
+    return overview["category"].iloc[selected_rows[0]]
+
+
+def display_model_comparison(comparison: ModelComparison, beta: float):
+    """Display side-by-side metrics of several models and paired McNemar tests between them."""
+    counts = comparison.counts
+    by_category = counts.index.nlevels > 1
+    overall_metrics = compute_category_metrics(comparison.overall_counts, beta).rename_axis("model").reset_index()
+    metric_columns = {
+        "model": st.column_config.TextColumn("Model", width="medium"),
+        "samples": st.column_config.NumberColumn("Sample Count", format="localized"),
+        "precision": _percentage_column("Precision"),
+        "recall": _percentage_column("Recall"),
+        "fbeta_score": _percentage_column(f"F{beta:.1f}-Score"),
+        "accuracy": _percentage_column("Accuracy"),
+    }
+
+    st.markdown("### 📊 **Metrics per Model**")
+    st.dataframe(overall_metrics, use_container_width=True, hide_index=True, column_config=metric_columns)
+
+    st.markdown("### 🧪 **Paired McNemar Tests**")
+    tests = compare_models_mcnemar(comparison.discordant)
+    st.dataframe(
+        tests,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "model_a": st.column_config.TextColumn("Model A"),
+            "model_b": st.column_config.TextColumn("Model B"),
+            "only_a_correct": st.column_config.NumberColumn("Only A Correct", format="localized"),
+            "only_b_correct": st.column_config.NumberColumn("Only B Correct", format="localized"),
+            "statistic": st.column_config.NumberColumn("Statistic", format="%.3f"),
+            "p_value": st.column_config.NumberColumn("p-value", format="%.4f"),
+        }
+    )
+    st.caption("💡 A p-value below 0.05 means the two models' error rates differ significantly on these samples.")
+
+    if by_category:
+        st.markdown("### 📂 **Metrics per Category and Model**")
+        category_metrics = compute_category_metrics(counts, beta).reset_index()
+        st.dataframe(
+            category_metrics,
+            use_container_width=True,
+            hide_index=True,
+            column_config={"category": st.column_config.TextColumn("Category", width="medium"), **metric_columns}
+        )
+    st.markdown("---")
+
+
+def display_report(report: Report):
+    """Display the results stored in a saved report bundle."""
+    metadata = report.metadata
+    columns = metadata.get("columns", {})
+    st.caption(
+        f"🗂️ **{metadata.get('source_name', 'Unknown source')}** computed on {metadata.get('created_at', 'unknown date')} "
+        f"with ground truth `{columns.get('truth')}`, predictions `{columns.get('prediction')}` and β={report.beta:.1f}"
+    )
+    if report.category_counts is None:
+        display_counts_and_metrics(report.counts, report.beta)
+        return
+    category_metrics = compute_category_metrics(report.category_counts, report.beta)
+    st.markdown("### 📋 **All Categories Overview**")
+    selected_category = display_category_overview(category_metrics, report.beta, key="report_overview")
+    if selected_category is None:
+        st.markdown("### 📈 **All Categories**")
+        display_counts_and_metrics(report.counts, report.beta, "All Categories")
+    else:
+        st.markdown(f"### 📂 **{selected_category}**")
+        display_counts_and_metrics(report.category_counts.loc[selected_category], report.beta, selected_category)
+
+
+def _wait_for_report():
+    """Poll the report being built, rerunning the app once it is ready."""
+    if st.session_state['report_future'].done():
+        st.rerun()
+    st.info("⏳ Report bundle is being prepared in the background...")
+
+
+def display_report_export(report: Report, source=None):
+    """
+    Let the user export computed results as a report bundle.
+
+    The bundle is built in a background thread so the page stays usable meanwhile.
+    Its future is kept in `st.session_state['report_future']`, to be cleared when metrics are computed again.
+    """
+    st.markdown("### 📦 **Export Results**")
+    future = st.session_state.get('report_future')
+    if future is None:
+        if st.button("📦 Prepare report bundle", help="Bundle metrics, confusion matrices and run metadata into a zip file"):
+            logger.info("Submitting report bundle")
+            st.session_state['report_future'] = submit_report_bundle(report, source)
+            st.rerun()
+        return
+    if not future.done():
+        st.fragment(run_every=1)(_wait_for_report)()
+        return
+    try:
+        content = future.result()
+    except Exception as e:
+        logger.error(f"Error building report bundle: {e}")
+        st.error("❌ Error building report bundle")
+        del st.session_state['report_future']
+        return
+    st.download_button(
+        "⬇️ Download report bundle",
+        data=content,
+        file_name=f"classification-report-{datetime.now():%Y%m%d-%H%M%S}.zip",
+        mime="application/zip"
+    )
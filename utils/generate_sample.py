@@ -1,26 +1,207 @@
-import uuid
+import argparse
 import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from .logging_config import get_logger, setup_logging
+
+logger = get_logger(__name__)
 
-def generate_sample(sample_size:int=10000, nb_categories:int=7): 
+
+def generate_sample(sample_size:int=10000, nb_categories:int=7, seed: int | None = None):
+    rng = random.Random(seed)
     data = []
     categories = ["CATEGORY_" + str(i) for i in range(1, nb_categories+1)]
 
     # Simulate varying performance (accuracy from 0.5 to 1) according to category
-    performances_per_category = {cat: random.randint(5, 10)/10 for cat in categories}
+    performances_per_category = {cat: rng.randint(5, 10)/10 for cat in categories}
 
     for _ in range(sample_size):
-        category = random.choice(categories)
+        category = rng.choice(categories)
         performance_for_category = performances_per_category[category]
-        ground_truth = random.choice([0, 1])
+        ground_truth = rng.choice([0, 1])
         # Simulate prediction with probability of it being same as ground truth = performance_for_category
-        prediction = ground_truth if bool(random.random() < performance_for_category) else int(not ground_truth)
+        prediction = ground_truth if bool(rng.random() < performance_for_category) else int(not ground_truth)
         data.append({
-            "id": str(uuid.uuid4()),
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
             "category": category,
             "is_category_real_value": ground_truth,
             "is_category_prediction": prediction
     })
 
     return pd.DataFrame(data)
+
+
+@dataclass
+class DatasetSpec:
+    """Parameters of a synthetic dataset generated by `generate_dataset`."""
+    nb_rows: int
+    nb_categories: int = 7
+    seed: int = 0
+    # Share of rows whose ground truth is 1
+    positive_rate: float = 0.5
+    # Zipf exponent of the category frequencies: 0 gives balanced categories
+    category_skew: float = 0.0
+    # Per-category accuracies are drawn uniformly in this range
+    min_accuracy: float = 0.5
+    max_accuracy: float = 1.0
+    # Add a "score" column with a prediction score consistent with the prediction
+    with_scores: bool = False
+    rows_per_shard: int = 1_000_000
+
+    def __post_init__(self):
+        if self.nb_rows <= 0 or self.nb_categories <= 0 or self.rows_per_shard <= 0:
+            raise ValueError("nb_rows, nb_categories and rows_per_shard should be positive")
+        if not 0 <= self.positive_rate <= 1:
+            raise ValueError("positive_rate should be between 0 and 1")
+        if not 0 <= self.min_accuracy <= self.max_accuracy <= 1:
+            raise ValueError("Accuracies should satisfy 0 <= min_accuracy <= max_accuracy <= 1")
+        if self.category_skew < 0:
+            raise ValueError("category_skew should not be negative")
+
+
+def category_distribution(spec: DatasetSpec) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Draw the categories, their frequencies and accuracies of a dataset from its seed.
+
+    Returns:
+        Tuple of (category names, category probabilities, category accuracies)
+    """
+    rng = np.random.default_rng([spec.seed, 0])
+    categories = np.array([f"CATEGORY_{i}" for i in range(1, spec.nb_categories + 1)])
+    weights = 1.0 / np.arange(1, spec.nb_categories + 1) ** spec.category_skew
+    accuracies = rng.uniform(spec.min_accuracy, spec.max_accuracy, size=spec.nb_categories)
+    return categories, weights / weights.sum(), accuracies
+
+
+def generate_shard(spec: DatasetSpec, shard_index: int) -> pd.DataFrame:
+    """
+    Generate one shard of a dataset.
+
+    Each shard has its own random generator derived from the dataset seed and
+    the shard index, so the dataset doesn't depend on how shards are spread
+    across workers.
+    """
+    categories, probabilities, accuracies = category_distribution(spec)
+    start = shard_index * spec.rows_per_shard
+    size = min(spec.rows_per_shard, spec.nb_rows - start)
+    rng = np.random.default_rng([spec.seed, 1, shard_index])
+
+    category_codes = rng.choice(len(categories), size=size, p=probabilities)
+    ground_truth = rng.random(size) < spec.positive_rate
+    is_correct = rng.random(size) < accuracies[category_codes]
+    prediction = np.where(is_correct, ground_truth, ~ground_truth)
+    shard = pd.DataFrame({
+        "id": np.arange(start, start + size),
+        "category": pd.Categorical.from_codes(category_codes, categories=categories),
+        "is_category_real_value": ground_truth.astype(np.int8),
+        "is_category_prediction": prediction.astype(np.int8),
+    })
+    if spec.with_scores:
+        # Score above 0.5 when the prediction is 1, below otherwise
+        shard["score"] = np.where(prediction, 0.5 + rng.random(size) / 2, rng.random(size) / 2).astype(np.float32)
+    return shard
+
+
+def _write_shard(spec: DatasetSpec, shard_index: int, output_dir: Path, file_format: str) -> Path:
+    """Generate one shard and write it to disk, returning its path."""
+    shard = generate_shard(spec, shard_index)
+    path = output_dir / f"part-{shard_index:05d}.{file_format}"
+    if file_format == "parquet":
+        shard.to_parquet(path, index=False)
+    else:
+        shard.to_csv(path, index=False)
+    logger.info(f"Wrote {len(shard):,} rows to {path}")
+    return path
+
+
+def generate_dataset(
+    spec: DatasetSpec,
+    output_dir: str | Path,
+    file_format: str = "parquet",
+    max_workers: int | None = None,
+    overwrite: bool = False
+) -> list[Path]:
+    """
+    Generate a dataset on disk as one file per shard, generating shards in parallel worker processes.
+
+    The same spec always produces the same files, whatever the number of workers.
+    Only one shard per worker is held in memory at a time.
+
+    Args:
+        spec: Parameters of the dataset
+        output_dir: Directory where shard files are written
+        file_format: "parquet" (requires pyarrow) or "csv"
+        max_workers: Number of worker processes (default: number of CPUs)
+        overwrite: Remove shards of a previous dataset from output_dir instead of refusing to write there
+
+    Raises:
+        ValueError: If output_dir isn't empty, unless overwrite is set and it only contains shards
+
+    Returns:
+        Paths of the written shards
+    """
+    if file_format not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported file format: {file_format}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Leftover files would be scanned along with the new shards as part of the dataset
+    existing = list(output_dir.iterdir())
+    if existing and not overwrite:
+        raise ValueError(f"{output_dir} is not empty: use overwrite to replace a previous dataset")
+    if existing:
+        others = [f.name for f in existing if not (f.is_file() and f.name.startswith("part-"))]
+        if others:
+            raise ValueError(f"{output_dir} contains other files than shards: {others}")
+        logger.info(f"Removing {len(existing)} shards of a previous dataset from {output_dir}")
+        for f in existing:
+            f.unlink()
+    nb_shards = -(-spec.nb_rows // spec.rows_per_shard)
+    logger.info(f"Generating {spec.nb_rows:,} rows in {nb_shards} shards to {output_dir}")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_write_shard, spec, shard_index, output_dir, file_format)
+            for shard_index in range(nb_shards)
+        ]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic classification dataset on disk.")
+    parser.add_argument("output_dir", type=Path, help="Directory where shard files are written")
+    parser.add_argument("--rows", type=int, required=True, help="Total number of rows")
+    parser.add_argument("--categories", type=int, default=DatasetSpec.nb_categories, help="Number of categories")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed, help="Seed of the dataset")
+    parser.add_argument("--positive-rate", type=float, default=DatasetSpec.positive_rate, help="Share of rows whose ground truth is 1")
+    parser.add_argument("--category-skew", type=float, default=DatasetSpec.category_skew, help="Zipf exponent of category frequencies (0 = balanced)")
+    parser.add_argument("--min-accuracy", type=float, default=DatasetSpec.min_accuracy, help="Lowest per-category accuracy")
+    parser.add_argument("--max-accuracy", type=float, default=DatasetSpec.max_accuracy, help="Highest per-category accuracy")
+    parser.add_argument("--with-scores", action="store_true", help="Add a prediction score column")
+    parser.add_argument("--rows-per-shard", type=int, default=DatasetSpec.rows_per_shard, help="Number of rows per shard file")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="Output file format")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--overwrite", action="store_true", help="Replace the shards of a previous dataset in output_dir")
+    args = parser.parse_args()
+
+    setup_logging()
+    spec = DatasetSpec(
+        nb_rows=args.rows,
+        nb_categories=args.categories,
+        seed=args.seed,
+        positive_rate=args.positive_rate,
+        category_skew=args.category_skew,
+        min_accuracy=args.min_accuracy,
+        max_accuracy=args.max_accuracy,
+        with_scores=args.with_scores,
+        rows_per_shard=args.rows_per_shard,
+    )
+    generate_dataset(spec, args.output_dir, args.format, args.workers, args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Size of the blocks copied from an upload to disk and hashed when reading files
+CHUNK_SIZE = 8 * 1024 * 1024
+# Number of CSV rows parsed at a time when loading a large file
+ROWS_PER_CHUNK = 250_000
+# Object columns with a lower ratio of unique values are stored as categoricals
+CATEGORICAL_RATIO = 0.5
+
+SPOOL_DIR = Path(os.environ.get("LARGE_FILE_SPOOL_DIR", Path(tempfile.gettempdir()) / "classification-metrics"))
+# Spooled files older than this belong to sessions which are gone and are removed
+SPOOL_MAX_AGE_SECONDS = float(os.environ.get("LARGE_FILE_SPOOL_MAX_AGE_HOURS", 6)) * 3600
+# Uploads bigger than this are parsed through the large-file path even if the mode is off
+LARGE_UPLOAD_BYTES = int(os.environ.get("LARGE_FILE_THRESHOLD_MB", 50)) * 1024 * 1024
+DATA_DIR = Path(os.environ.get("LARGE_FILE_DATA_DIR", "/data"))
+
+SUPPORTED_EXTENSIONS = (".csv",)
+
+
+def spool_upload(uploaded_file, chunk_size: int = CHUNK_SIZE) -> Path:
+    """
+    Copy an uploaded file to a temporary file on disk, one chunk at a time.
+
+    Args:
+        uploaded_file: File-like object as returned by `st.file_uploader`
+        chunk_size: Number of bytes copied at a time
+
+    Returns:
+        Path of the spooled file
+    """
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    clean_spool_dir(SPOOL_MAX_AGE_SECONDS)
+    suffix = Path(uploaded_file.name).suffix
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=SPOOL_DIR, suffix=suffix, delete=False) as spooled:
+        shutil.copyfileobj(uploaded_file, spooled, length=chunk_size)
+    logger.info(f"Spooled upload {uploaded_file.name} to {spooled.name}")
+    return Path(spooled.name)
+
+
+def clean_spool_dir(max_age_seconds: float | None = None):
+    """
+    Remove spooled uploads from `SPOOL_DIR`.
+
+    Args:
+        max_age_seconds: Only remove files last modified longer ago than this (default: remove all files)
+    """
+    if not SPOOL_DIR.is_dir():
+        return
+    now = time.time()
+    for spooled in SPOOL_DIR.iterdir():
+        try:
+            if spooled.is_file() and (max_age_seconds is None or now - spooled.stat().st_mtime > max_age_seconds):
+                spooled.unlink()
+                logger.info(f"Removed spooled upload {spooled}")
+        except FileNotFoundError:
+            # Removed meanwhile by another session
+            continue
+
+
+@st.cache_resource(show_spinner=False)
+def clean_spool_dir_on_startup():
+    """Remove uploads spooled by a previous server process. Cached so it only runs once per process."""
+    clean_spool_dir()
+
+
+def resolve_local_path(path: str, allow_dataset: bool = False) -> Path:
+    """
+    Resolve a path to a file on the mounted data volume.
+
+    Relative paths are resolved against `DATA_DIR`. Paths outside of it are rejected.
+
+    Args:
+        path: Path of the file
+        allow_dataset: Also accept Parquet files and directories, which can only be scanned out-of-core
+
+    Raises:
+        ValueError: If the path is outside of the data volume, missing or not a supported file
+    """
+    data_dir = DATA_DIR.resolve()
+    resolved = (data_dir / path).resolve()
+    if not resolved.is_relative_to(data_dir):
+        raise ValueError(f"{path} is not inside the data directory {data_dir}")
+    if allow_dataset and resolved.is_dir():
+        return resolved
+    if not resolved.is_file():
+        raise ValueError(f"{resolved} does not exist or is not a file")
+    extensions = SUPPORTED_EXTENSIONS + (".parquet",) if allow_dataset else SUPPORTED_EXTENSIONS
+    if resolved.suffix.lower() not in extensions:
+        raise ValueError(f"{resolved.name} is not a supported file ({', '.join(extensions)})")
+    return resolved
+
+
+def file_sha256(path: Path, chunk_size: int = CHUNK_SIZE) -> str:
+    """Hash a file on disk without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(chunk_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _downcast(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Store each column of a chunk with the smallest dtype able to hold it."""
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast="float")
+        elif series.dtype == object and series.nunique() < CATEGORICAL_RATIO * len(series):
+            chunk[col] = series.astype("category")
+    return chunk
+
+
+def load_large_file(path: Path, usecols: list[str] | None = None, rows_per_chunk: int = ROWS_PER_CHUNK) -> pd.DataFrame:
+    """
+    Parse a large CSV file from disk.
+
+    The file is memory-mapped and parsed in chunks, keeping only `usecols` and
+    downcasting each chunk before the next one is read, so that the peak memory
+    stays close to the size of the compact selected columns rather than to the
+    size of the raw file. The result must still fit in memory: larger files
+    can only be evaluated out-of-core.
+
+    Args:
+        path: Path of the CSV file
+        usecols: Columns to keep (default: all columns)
+        rows_per_chunk: Number of rows parsed at a time
+
+    Returns:
+        DataFrame with compact dtypes
+    """
+    logger.info(f"Loading columns {usecols or 'all'} of large file {path} in chunks of {rows_per_chunk:,} rows")
+    chunks = [
+        _downcast(chunk)
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=rows_per_chunk, memory_map=True, low_memory=True)
+    ]
+    if not chunks:
+        return pd.read_csv(path, usecols=usecols, nrows=0)
+    # Categories differ from chunk to chunk: union them so concat keeps the categorical dtype
+    categorical_cols = [col for col in chunks[0].columns if all(isinstance(c[col].dtype, pd.CategoricalDtype) for c in chunks)]
+    for col in categorical_cols:
+        union = pd.api.types.union_categoricals([c[col] for c in chunks])
+        for c in chunks:
+            c[col] = pd.Categorical(c[col], categories=union.categories)
+    df = pd.concat(chunks, ignore_index=True)
+    logger.info(f"Loaded {len(df):,} rows using {df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+    return df
+
@@ -1,9 +1,12 @@
-
-
+import math
 from dataclasses import dataclass
 
+import numpy as np
+import pandas as pd
 from sklearn.metrics import confusion_matrix, fbeta_score, precision_score, recall_score
 
+COUNT_COLUMNS = ["tn", "fp", "fn", "tp"]
+
 
 @dataclass
 class BinaryMetricsResult:
@@ -32,3 +35,200 @@ def compute_binary_metrics(
         recall=recall,
         fbeta_score=fbeta
     )
+
+
+def _safe_divide(numerator, denominator):
+    """Divide element-wise, returning 0 where the denominator is 0 (like sklearn's zero_division=0)."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def binary_metrics_from_counts(
+    tn: int,
+    fp: int,
+    fn: int,
+    tp: int,
+    beta: float = 1.0
+) -> BinaryMetricsResult:
+    """
+    Compute the same result as `compute_binary_metrics` from already aggregated confusion counts.
+    """
+    beta2 = beta ** 2
+    return BinaryMetricsResult(
+        confusion_matrix=[[int(tn), int(fp)], [int(fn), int(tp)]],
+        precision=float(_safe_divide(tp, tp + fp)),
+        recall=float(_safe_divide(tp, tp + fn)),
+        fbeta_score=float(_safe_divide((1 + beta2) * tp, (1 + beta2) * tp + beta2 * fn + fp))
+    )
+
+
+def as_binary(values, name: str = "values") -> np.ndarray:
+    """
+    Convert boolean or 0/1 values to a boolean array.
+
+    Raises:
+        ValueError: If values contain anything else than 0/1 or booleans
+    """
+    values = np.asarray(values)
+    if values.dtype != bool:
+        valid = np.isin(values, [0, 1])
+        if not valid.all():
+            raise ValueError(f"{name} should only contain 0/1 or boolean values")
+        values = values == 1
+    return values
+
+
+def _outcomes(df: pd.DataFrame, truth_col: str, pred_col: str) -> pd.DataFrame:
+    """Flag each row as a true/false negative/positive, one boolean column per count."""
+    y_true = as_binary(df[truth_col], truth_col)
+    y_pred = as_binary(df[pred_col], pred_col)
+    return pd.DataFrame({
+        "tn": ~y_true & ~y_pred,
+        "fp": ~y_true & y_pred,
+        "fn": y_true & ~y_pred,
+        "tp": y_true & y_pred,
+    }, index=df.index)
+
+
+def compute_counts(df: pd.DataFrame, truth_col: str, pred_col: str) -> pd.Series:
+    """
+    Count true/false negatives/positives of all rows.
+
+    Returns:
+        Series with one value per count ("tn", "fp", "fn", "tp")
+    """
+    return _outcomes(df, truth_col, pred_col).sum()[COUNT_COLUMNS]
+
+
+def compute_category_counts(
+    df: pd.DataFrame,
+    truth_col: str,
+    pred_col: str,
+    category_col: str
+) -> pd.DataFrame:
+    """
+    Count true/false negatives/positives of every category in a single grouped aggregation.
+
+    Returns:
+        DataFrame indexed by category, with one column per count ("tn", "fp", "fn", "tp")
+    """
+    outcomes = _outcomes(df, truth_col, pred_col)
+    return outcomes.groupby(df[category_col], observed=True, sort=True).sum()[COUNT_COLUMNS]
+
+
+def compute_category_metrics(counts: pd.DataFrame, beta: float = 1.0) -> pd.DataFrame:
+    """
+    Compute sample count, precision, recall, f-beta score and accuracy of every row of confusion counts.
+
+    Args:
+        counts: DataFrame with "tn", "fp", "fn" and "tp" columns, as returned by `compute_category_counts`
+        beta: Beta value of the f-beta score
+    """
+    tn, fp, fn, tp = (counts[col].to_numpy() for col in COUNT_COLUMNS)
+    beta2 = beta ** 2
+    samples = tn + fp + fn + tp
+    return pd.DataFrame({
+        "samples": samples,
+        "precision": _safe_divide(tp, tp + fp),
+        "recall": _safe_divide(tp, tp + fn),
+        "fbeta_score": _safe_divide((1 + beta2) * tp, (1 + beta2) * tp + beta2 * fn + fp),
+        "accuracy": _safe_divide(tp + tn, samples),
+    }, index=counts.index)
+
+
+@dataclass
+class ModelComparison:
+    # Confusion counts of each model, indexed by model (or by category and model)
+    counts: pd.DataFrame
+    # Confusion counts of each model over all samples, indexed by model
+    overall_counts: pd.DataFrame
+    # Square DataFrame of models: number of samples the row model got right and the column model got wrong
+    discordant: pd.DataFrame
+
+
+def compute_model_comparison(
+    df: pd.DataFrame,
+    truth_col: str,
+    pred_cols: list[str],
+    category_col: str | None = None
+) -> ModelComparison:
+    """
+    Count true/false negatives/positives of several models against the same ground truth, in one vectorized pass.
+
+    Predictions are stacked into a (samples x models) array compared at once to the ground truth.
+    The same pass also counts, for each pair of models, the samples only one of them got right.
+    """
+    y_true = as_binary(df[truth_col], truth_col)[:, np.newaxis]
+    y_pred = np.column_stack([as_binary(df[col], col) for col in pred_cols])
+    outcomes = {
+        "tn": ~y_true & ~y_pred,
+        "fp": ~y_true & y_pred,
+        "fn": y_true & ~y_pred,
+        "tp": y_true & y_pred,
+    }
+    # Overall counts come from all rows: grouping drops rows without a category
+    overall_counts = pd.DataFrame({name: outcome.sum(axis=0) for name, outcome in outcomes.items()}, index=pd.Index(pred_cols, name="model"))
+    if category_col is None:
+        counts = overall_counts
+    else:
+        # One column per (count, model) pair, all summed in a single groupby
+        flat = pd.DataFrame(
+            np.hstack(list(outcomes.values())),
+            columns=pd.MultiIndex.from_product([COUNT_COLUMNS, pred_cols]),
+            index=df.index
+        )
+        grouped = flat.groupby(df[category_col], observed=True, sort=True).sum()
+        counts = grouped.stack(level=1, future_stack=True)[COUNT_COLUMNS]
+        counts.index.names = ["category", "model"]
+
+    correct = (y_pred == y_true).astype(np.float64)
+    discordant = correct.T @ (1.0 - correct)
+    return ModelComparison(
+        counts=counts,
+        overall_counts=overall_counts,
+        discordant=pd.DataFrame(discordant.astype(np.int64), index=pred_cols, columns=pred_cols)
+    )
+
+
+def mcnemar_test(only_a_correct: int, only_b_correct: int) -> tuple[float, float]:
+    """
+    Paired McNemar test of two models evaluated on the same samples.
+
+    Uses the exact binomial test when there are fewer than 25 discordant samples,
+    and the chi-squared statistic with continuity correction otherwise.
+
+    Returns:
+        Tuple of (statistic, two-sided p-value)
+    """
+    b, c = int(only_a_correct), int(only_b_correct)
+    n = b + c
+    if n == 0:
+        return 0.0, 1.0
+    if n < 25:
+        tail = sum(math.comb(n, k) for k in range(min(b, c) + 1)) / 2 ** n
+        return float(min(b, c)), min(1.0, 2 * tail)
+    statistic = (abs(b - c) - 1) ** 2 / n
+    return statistic, math.erfc(math.sqrt(statistic / 2))
+
+
+def compare_models_mcnemar(discordant: pd.DataFrame) -> pd.DataFrame:
+    """
+    Run a McNemar test for every pair of models from the discordant counts of a `ModelComparison`.
+    """
+    rows = []
+    models = discordant.index.tolist()
+    for i, model_a in enumerate(models):
+        for model_b in models[i + 1:]:
+            only_a = discordant.loc[model_a, model_b]
+            only_b = discordant.loc[model_b, model_a]
+            statistic, p_value = mcnemar_test(only_a, only_b)
+            rows.append({
+                "model_a": model_a,
+                "model_b": model_b,
+                "only_a_correct": only_a,
+                "only_b_correct": only_b,
+                "statistic": statistic,
+                "p_value": p_value,
+            })
+    return pd.DataFrame(rows, columns=["model_a", "model_b", "only_a_correct", "only_b_correct", "statistic", "p_value"])
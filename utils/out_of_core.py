@@ -0,0 +1,274 @@
+import argparse
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+
+from .logging_config import get_logger, setup_logging
+from .metrics import (
+    COUNT_COLUMNS,
+    BinaryMetricsResult,
+    binary_metrics_from_counts,
+    compute_category_counts,
+    compute_counts,
+)
+
+logger = get_logger(__name__)
+
+# Number of rows read from disk at a time
+ROWS_PER_BATCH = 500_000
+
+DATASET_EXTENSIONS = (".csv", ".parquet")
+
+
+@dataclass
+class ScanStats:
+    """Amount of data read from disk by a scan."""
+    bytes_scanned: int = 0
+    bytes_skipped: int = 0
+    rows_scanned: int = 0
+    batches: int = 0
+
+
+@dataclass
+class OutOfCoreCounts:
+    """Confusion counts of a dataset scanned from disk."""
+    # Overall counts ("tn", "fp", "fn", "tp") of the scanned rows
+    counts: pd.Series
+    # Counts per category, indexed by category (None if scanned without category column)
+    category_counts: pd.DataFrame | None
+    stats: ScanStats
+
+
+@dataclass
+class OutOfCoreEvaluation:
+    """Metrics of a dataset scanned from disk."""
+    overall: BinaryMetricsResult
+    per_category: dict[str, BinaryMetricsResult] = field(default_factory=dict)
+    stats: ScanStats = field(default_factory=ScanStats)
+
+
+def dataset_files(path: str | Path) -> list[Path]:
+    """
+    List the files of a dataset: either a single CSV/Parquet file or a directory of such files (e.g. shards).
+
+    Raises:
+        ValueError: If the path contains no supported file
+    """
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(f for f in path.iterdir() if f.is_file() and f.suffix.lower() in DATASET_EXTENSIONS)
+    elif path.is_file() and path.suffix.lower() in DATASET_EXTENSIONS:
+        files = [path]
+    else:
+        files = []
+    if not files:
+        raise ValueError(f"{path} is not a CSV/Parquet file or a directory of such files")
+    return files
+
+
+def _parquet_file(path: Path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet files requires pyarrow to be installed") from e
+    return pq.ParquetFile(path)
+
+
+def read_preview(path: str | Path, nrows: int = 1000) -> pd.DataFrame:
+    """Read the first rows of a dataset, to show it and list its columns without loading it."""
+    first_file = dataset_files(path)[0]
+    if first_file.suffix.lower() == ".parquet":
+        parquet_file = _parquet_file(first_file)
+        batch = next(parquet_file.iter_batches(batch_size=nrows), None)
+        if batch is None:
+            return parquet_file.schema_arrow.empty_table().to_pandas()
+        return batch.to_pandas()
+    return pd.read_csv(first_file, nrows=nrows)
+
+
+def _cast_categories(categories: list[Any], dtype) -> list[Any]:
+    """Convert categories (e.g. strings from the command line) to the type of the category column."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    try:
+        return pd.Series(categories, dtype=object).astype(dtype).tolist()
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Categories {categories} can't be compared to the category column of type {dtype}") from e
+
+
+def _may_contain(statistics, categories: list[Any]) -> bool:
+    """Tell from row group statistics whether any of the categories may be in the row group."""
+    if statistics is None or not statistics.has_min_max:
+        return True
+    try:
+        return any(statistics.min <= category <= statistics.max for category in categories)
+    except TypeError:
+        return True
+
+
+def _scan_parquet(
+    path: Path,
+    columns: list[str],
+    category_col: str | None,
+    categories: list[Any] | None,
+    batch_size: int,
+    stats: ScanStats
+) -> Iterator[pd.DataFrame]:
+    parquet_file = _parquet_file(path)
+    missing = [col for col in columns if col not in parquet_file.schema_arrow.names]
+    if missing:
+        raise ValueError(f"Columns {missing} are missing from {path}")
+    metadata = parquet_file.metadata
+    column_indexes = {parquet_file.schema_arrow.get_field_index(col) for col in columns}
+    category_index = parquet_file.schema_arrow.get_field_index(category_col) if category_col else None
+    if categories is not None:
+        category_dtype = parquet_file.schema_arrow.empty_table().to_pandas()[category_col].dtype
+        categories = _cast_categories(categories, category_dtype)
+
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        sizes = [row_group.column(j).total_compressed_size for j in range(row_group.num_columns)]
+        if categories is not None and not _may_contain(row_group.column(category_index).statistics, categories):
+            # Category filter pushed down: the whole row group is skipped
+            stats.bytes_skipped += sum(sizes)
+            continue
+        # Column projection: only the needed columns are read
+        needed = sum(size for j, size in enumerate(sizes) if j in column_indexes)
+        stats.bytes_scanned += needed
+        stats.bytes_skipped += sum(sizes) - needed
+        row_groups.append(i)
+
+    if row_groups:
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+            yield batch.to_pandas()
+
+
+def _scan_csv(path: Path, columns: list[str], batch_size: int, stats: ScanStats) -> Iterator[pd.DataFrame]:
+    # CSV rows must be parsed entirely to find the columns: nothing can be skipped
+    stats.bytes_scanned += path.stat().st_size
+    yield from pd.read_csv(path, usecols=columns, chunksize=batch_size, memory_map=True)
+
+
+def scan_confusion_counts(
+    path: str | Path,
+    truth_col: str,
+    pred_col: str,
+    category_col: str | None = None,
+    categories: list[Any] | None = None,
+    batch_size: int = ROWS_PER_BATCH
+) -> OutOfCoreCounts:
+    """
+    Compute confusion counts of a dataset on disk, reading it one batch at a time.
+
+    Only the needed columns are read. When categories are given, Parquet row groups
+    which can't contain them are skipped from their statistics, and other rows are
+    filtered out batch by batch.
+
+    Args:
+        path: CSV/Parquet file or directory of such files
+        truth_col: Name of the ground truth column
+        pred_col: Name of the predicted values column
+        category_col: Optional name of the category column, to count each category separately
+        categories: Optional categories to keep (requires category_col), converted to the type of its values
+        batch_size: Number of rows read at a time
+
+    Raises:
+        ValueError: If the dataset can't be found, its values aren't 0/1 or booleans
+            or the categories can't be converted to the type of the category column
+    """
+    if categories is not None and category_col is None:
+        raise ValueError("Filtering categories requires a category column")
+    columns = [truth_col, pred_col] + ([category_col] if category_col else [])
+    columns = list(dict.fromkeys(columns))
+    stats = ScanStats()
+    partial_counts = []
+    partial_category_counts = []
+
+    for file in dataset_files(path):
+        logger.info(f"Scanning {file}")
+        if file.suffix.lower() == ".parquet":
+            batches = _scan_parquet(file, columns, category_col, categories, batch_size, stats)
+        else:
+            batches = _scan_csv(file, columns, batch_size, stats)
+        for batch in batches:
+            stats.batches += 1
+            stats.rows_scanned += len(batch)
+            if categories is not None:
+                batch = batch[batch[category_col].isin(_cast_categories(categories, batch[category_col].dtype))]
+            # Overall counts come from all rows: grouping drops rows without a category
+            partial_counts.append(compute_counts(batch, truth_col, pred_col))
+            if category_col:
+                partial_category_counts.append(compute_category_counts(batch, truth_col, pred_col, category_col))
+
+    logger.info(
+        f"Scanned {stats.rows_scanned:,} rows in {stats.batches} batches: "
+        f"{stats.bytes_scanned:,} bytes scanned, {stats.bytes_skipped:,} bytes skipped"
+    )
+    counts = pd.DataFrame(partial_counts, columns=COUNT_COLUMNS).sum().astype("int64")
+    category_counts = None
+    if category_col:
+        if partial_category_counts:
+            # Categorical indexes (e.g. from Parquet) would otherwise get a row for every unobserved category
+            category_counts = (
+                pd.concat(partial_category_counts)
+                .groupby(level=0, observed=True, sort=True)
+                .sum()[COUNT_COLUMNS]
+                .astype("int64")
+            )
+        else:
+            category_counts = pd.DataFrame(columns=COUNT_COLUMNS, dtype="int64")
+        if categories is not None and len(category_counts) < len(set(categories)):
+            logger.warning(f"Only {len(category_counts)} of the categories {categories} were found in {path}")
+    return OutOfCoreCounts(counts=counts, category_counts=category_counts, stats=stats)
+
+
+def evaluate_out_of_core(
+    path: str | Path,
+    truth_col: str,
+    pred_col: str,
+    beta: float = 1.0,
+    category_col: str | None = None,
+    categories: list[Any] | None = None,
+    batch_size: int = ROWS_PER_BATCH
+) -> OutOfCoreEvaluation:
+    """
+    Compute the same metrics as `compute_binary_metrics` on a dataset too large to fit in memory.
+
+    See `scan_confusion_counts` for the arguments.
+    """
+    scan = scan_confusion_counts(path, truth_col, pred_col, category_col, categories, batch_size)
+    per_category = {}
+    if scan.category_counts is not None:
+        per_category = {
+            str(category): binary_metrics_from_counts(row.tn, row.fp, row.fn, row.tp, beta)
+            for category, row in scan.category_counts.iterrows()
+        }
+    counts = scan.counts
+    return OutOfCoreEvaluation(
+        overall=binary_metrics_from_counts(counts["tn"], counts["fp"], counts["fn"], counts["tp"], beta),
+        per_category=per_category,
+        stats=scan.stats
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute classification metrics of a CSV/Parquet dataset without loading it in memory.")
+    parser.add_argument("path", type=Path, help="CSV/Parquet file or directory of such files")
+    parser.add_argument("--truth", required=True, help="Ground truth column")
+    parser.add_argument("--pred", required=True, help="Predicted values column")
+    parser.add_argument("--beta", type=float, default=1.0, help="Beta value for F-beta score")
+    parser.add_argument("--category", default=None, help="Optional category column")
+    parser.add_argument("--only", nargs="+", default=None, help="Only evaluate these categories")
+    args = parser.parse_args()
+
+    setup_logging()
+    evaluation = evaluate_out_of_core(args.path, args.truth, args.pred, args.beta, args.category, args.only)
+    print(json.dumps(asdict(evaluation), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,29 @@ from typing import Any
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
+from matplotlib.figure import Figure
+
+# Set style for professional appearance. Set once at import: updating the global
+# settings on every plot would change them while reports are drawn in the background
+sns.set_style("whitegrid")
+plt.rcParams.update({
+    'font.size': 12,
+    'font.weight': 'normal',
+    'axes.titleweight': 'bold',
+    'axes.titlesize': 14
+})
 
 
 def plot_confusion_matrix(cm, categories: list[Any]):
     """Create a professional-looking confusion matrix plot."""
-    
-    # Set up the figure with better styling
-    plt.figure(figsize=(8, 6))
-    
-    # Set style for professional appearance
-    sns.set_style("whitegrid")
-    plt.rcParams.update({
-        'font.size': 12,
-        'font.weight': 'normal',
-        'axes.titleweight': 'bold',
-        'axes.titlesize': 14
-    })
+
+    # Set up the figure with better styling. The figure isn't managed by pyplot,
+    # so it can be drawn from a background thread and is freed once unused.
+    fig = Figure(figsize=(8, 6))
+    ax = fig.add_subplot()
     
     # Create the heatmap with enhanced styling
-    ax = sns.heatmap(
+    sns.heatmap(
         cm, 
         annot=True, 
         fmt='d', 
@@ -32,12 +36,13 @@ def plot_confusion_matrix(cm, categories: list[Any]):
         annot_kws={'size': 16, 'weight': 'bold'},
         linewidths=2,
         linecolor='white',
-        square=True
+        square=True,
+        ax=ax
     )
     
     # Enhance the plot aesthetics
-    plt.xlabel('Predicted Labels', fontsize=13, fontweight='bold', labelpad=10)
-    plt.ylabel('True Labels', fontsize=13, fontweight='bold', labelpad=10)
+    ax.set_xlabel('Predicted Labels', fontsize=13, fontweight='bold', labelpad=10)
+    ax.set_ylabel('True Labels', fontsize=13, fontweight='bold', labelpad=10)
     
     # Customize tick labels
     ax.set_xticklabels(ax.get_xticklabels(), rotation=0, ha='center', fontweight='bold')
@@ -47,7 +52,7 @@ def plot_confusion_matrix(cm, categories: list[Any]):
     total = np.sum(cm)
     for i in range(len(cm)):
         for j in range(len(cm[0])):
-            percentage = (cm[i][j] / total) * 100
+            percentage = (cm[i][j] / total) * 100 if total else 0.0
             ax.text(j + 0.5, i + 0.7, f'({percentage:.1f}%)', 
                    horizontalalignment='center',
                    verticalalignment='center',
@@ -56,7 +61,7 @@ def plot_confusion_matrix(cm, categories: list[Any]):
                    fontweight='normal')
     
     # Improve layout
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Add a subtle border
     for spine in ax.spines.values():
@@ -64,4 +69,4 @@ def plot_confusion_matrix(cm, categories: list[Any]):
         spine.set_linewidth(1.5)
         spine.set_edgecolor('#cccccc')
     
-    return plt.gcf()  # Return the figure for Streamlit to display
+    return fig  # Return the figure for Streamlit to display
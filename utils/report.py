@@ -0,0 +1,181 @@
+import hashlib
+import io
+import json
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from .large_files import file_sha256
+from .logging_config import get_logger
+from .metrics import COUNT_COLUMNS, binary_metrics_from_counts, compute_category_metrics
+from .out_of_core import dataset_files
+from .plots import plot_confusion_matrix
+
+logger = get_logger(__name__)
+
+REPORT_FORMAT_VERSION = 1
+# Resolution of the confusion matrix images of a report
+PLOT_DPI = 80
+# Besides the overall one, only the confusion matrices of the categories with the
+# lowest f-beta scores are rendered: the others are redrawn from their counts when needed
+MAX_CATEGORY_PLOTS = 20
+# Datasets on disk bigger than this are identified by the size and modification time
+# of their files rather than hashed, which would read them entirely once more
+MAX_HASHED_BYTES = 256 * 1024 * 1024
+
+# Reports are built one at a time, away from the Streamlit script thread
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+
+
+@dataclass
+class Report:
+    """Results of a metrics computation, as stored in a report bundle."""
+    # Overall counts ("tn", "fp", "fn", "tp")
+    counts: pd.Series
+    # Counts per category, indexed by category (None if computed without category column)
+    category_counts: pd.DataFrame | None
+    beta: float
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+def source_sha256(source: str | Path | pd.DataFrame | bytes) -> str:
+    """Hash the data a report was computed from: raw bytes, a file, a directory of shards or a DataFrame."""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    if isinstance(source, pd.DataFrame):
+        return hashlib.sha256(pd.util.hash_pandas_object(source, index=False).to_numpy().tobytes()).hexdigest()
+    files = dataset_files(source) if Path(source).is_dir() else [Path(source)]
+    if len(files) == 1:
+        return file_sha256(files[0])
+    # Directory of shards: hash of the hashes of its files
+    return hashlib.sha256("".join(file_sha256(f) for f in files).encode()).hexdigest()
+
+
+def source_metadata(source: str | Path | pd.DataFrame | bytes) -> dict[str, Any]:
+    """
+    Identify the data a report was computed from.
+
+    Returns:
+        {"source_sha256": hash} as returned by `source_sha256`, or for datasets on disk
+        bigger than `MAX_HASHED_BYTES`, {"source_files": [...]} with the path, size and
+        modification time of each file
+    """
+    if isinstance(source, (bytes, pd.DataFrame)):
+        return {"source_sha256": source_sha256(source)}
+    files = dataset_files(source) if Path(source).is_dir() else [Path(source)]
+    stats = [f.stat() for f in files]
+    if sum(stat.st_size for stat in stats) <= MAX_HASHED_BYTES:
+        return {"source_sha256": source_sha256(source)}
+    return {
+        "source_files": [
+            {
+                "path": str(f),
+                "size": stat.st_size,
+                "modified_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+            }
+            for f, stat in zip(files, stats)
+        ]
+    }
+
+
+def _metrics_entry(counts: pd.Series, beta: float) -> dict[str, Any]:
+    result = binary_metrics_from_counts(counts["tn"], counts["fp"], counts["fn"], counts["tp"], beta)
+    return {
+        "counts": {col: int(counts[col]) for col in COUNT_COLUMNS},
+        "metrics": asdict(result),
+    }
+
+
+def _write_plot(bundle: zipfile.ZipFile, name: str, counts: pd.Series):
+    cm = [[int(counts["tn"]), int(counts["fp"])], [int(counts["fn"]), int(counts["tp"])]]
+    fig = plot_confusion_matrix(cm, [0, 1])
+    image = io.BytesIO()
+    fig.savefig(image, format="png", dpi=PLOT_DPI)
+    bundle.writestr(name, image.getvalue())
+
+
+def build_report_bundle(report: Report, source: str | Path | pd.DataFrame | bytes | None = None) -> bytes:
+    """
+    Write a report to a zip bundle: metrics.json, metadata.json and confusion matrix images.
+
+    Images are rendered for all samples and for the `MAX_CATEGORY_PLOTS` categories with
+    the lowest f-beta scores. Their paths are recorded in metrics.json, where the "plot"
+    of other categories is null.
+
+    Args:
+        report: Counts and metadata of the computation
+        source: Data the report was computed from, identified in the metadata (see `source_metadata`)
+
+    Returns:
+        Content of the zip file
+    """
+    start = datetime.now()
+    metadata = {
+        "format_version": REPORT_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "beta": report.beta,
+        **report.metadata,
+    }
+    if source is not None:
+        metadata.update(source_metadata(source))
+
+    metrics = {"overall": {**_metrics_entry(report.counts, report.beta), "plot": "plots/overall.png"}, "categories": []}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        _write_plot(bundle, "plots/overall.png", report.counts)
+        if report.category_counts is not None:
+            category_metrics = compute_category_metrics(report.category_counts, report.beta)
+            worst = set(category_metrics["fbeta_score"].nsmallest(MAX_CATEGORY_PLOTS).index)
+            for i, (category, counts) in enumerate(report.category_counts.iterrows()):
+                plot_name = None
+                if category in worst:
+                    plot_name = f"plots/category-{i:05d}.png"
+                    _write_plot(bundle, plot_name, counts)
+                metrics["categories"].append({"category": str(category), **_metrics_entry(counts, report.beta), "plot": plot_name})
+        bundle.writestr("metrics.json", json.dumps(metrics, indent=2))
+        bundle.writestr("metadata.json", json.dumps(metadata, indent=2, default=str))
+    logger.info(f"Report bundle built in {(datetime.now() - start).total_seconds():.2f} seconds")
+    return buffer.getvalue()
+
+
+def submit_report_bundle(report: Report, source: str | Path | pd.DataFrame | bytes | None = None) -> Future:
+    """Build a report bundle in a background thread, returning the future of its content."""
+    return _executor.submit(build_report_bundle, report, source)
+
+
+def load_report_bundle(bundle_file) -> Report:
+    """
+    Read back a report bundle written by `build_report_bundle`.
+
+    Args:
+        bundle_file: Path or file-like object of the zip file
+
+    Raises:
+        ValueError: If the file isn't a report bundle
+    """
+    try:
+        with zipfile.ZipFile(bundle_file) as bundle:
+            metrics = json.loads(bundle.read("metrics.json"))
+            metadata = json.loads(bundle.read("metadata.json"))
+        if metadata.get("format_version") != REPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported report format version: {metadata.get('format_version')}")
+
+        category_counts = None
+        if metrics["categories"]:
+            category_counts = pd.DataFrame(
+                [entry["counts"] for entry in metrics["categories"]],
+                index=pd.Index([entry["category"] for entry in metrics["categories"]], name="category"),
+            )[COUNT_COLUMNS]
+        return Report(
+            counts=pd.Series(metrics["overall"]["counts"])[COUNT_COLUMNS],
+            category_counts=category_counts,
+            beta=float(metadata.pop("beta")),
+            metadata=metadata,
+        )
+    except (zipfile.BadZipFile, KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a valid report bundle: {e!r}") from e
@@ -0,0 +1,114 @@
+import argparse
+import importlib
+import io
+import sys
+import threading
+import time
+
+from .logging_config import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# Modules imported by the app, imported ahead of the first session
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "sklearn.metrics",
+    "matplotlib",
+    "matplotlib.font_manager",
+    "seaborn",
+    "streamlit",
+    "streamlit.components.v1",
+]
+
+# Set by `main` when the server is started through the warm-up launcher
+_server_started_at: float | None = None
+_first_render_logged = False
+_first_render_lock = threading.Lock()
+
+
+def _timed(step: str, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Warm-up: {step} in {elapsed:.2f} seconds")
+    return elapsed
+
+
+def _import_modules():
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+def _build_font_cache():
+    # Loading the font manager builds the font cache in MPLCONFIGDIR if it doesn't exist yet
+    from matplotlib import font_manager
+    font_manager.findfont("DejaVu Sans")
+
+
+def _run_tiny_computation():
+    import pandas as pd
+
+    from .metrics import compute_binary_metrics, compute_category_counts, compute_category_metrics
+    from .plots import plot_confusion_matrix
+
+    df = pd.DataFrame({"category": ["A", "A", "B", "B"], "truth": [0, 1, 1, 0], "pred": [0, 1, 0, 1]})
+    result = compute_binary_metrics(df["truth"], df["pred"])
+    compute_category_metrics(compute_category_counts(df, "truth", "pred", "category"))
+    fig = plot_confusion_matrix(result.confusion_matrix, [0, 1])
+    fig.savefig(io.BytesIO(), format="png")
+
+
+def warm_up() -> float:
+    """
+    Import heavy modules, build the matplotlib font cache and run a tiny computation and plot.
+
+    Returns:
+        Total warm-up duration in seconds
+    """
+    total = sum([
+        _timed("modules imported", _import_modules),
+        _timed("font cache ready", _build_font_cache),
+        _timed("tiny metrics and plot computed", _run_tiny_computation),
+    ])
+    logger.info(f"Warm-up completed in {total:.2f} seconds")
+    return total
+
+
+def log_first_render():
+    """Log the time from server start to the end of the first script run, once per server process."""
+    global _first_render_logged
+    if _server_started_at is None or _first_render_logged:
+        return
+    with _first_render_lock:
+        if _first_render_logged:
+            return
+        _first_render_logged = True
+    logger.info(f"First render completed {time.perf_counter() - _server_started_at:.2f} seconds after server start")
+
+
+def main():
+    global _server_started_at
+    parser = argparse.ArgumentParser(description="Warm up the app, then optionally start the Streamlit server.")
+    parser.add_argument("--serve", action="store_true", help="Start `streamlit run app.py` once warmed up, passing the remaining arguments")
+    args, streamlit_args = parser.parse_known_args()
+
+    _server_started_at = time.perf_counter()
+    setup_logging()
+    warm_up()
+    if not args.serve:
+        return
+
+    # The server runs in this process, so the modules warmed up above are
+    # already loaded when the first session runs the app. The health endpoint
+    # only answers once the server is started, i.e. once warm-up is done.
+    from streamlit.web import cli as streamlit_cli
+    sys.argv = ["streamlit", "run", "app.py", *streamlit_args]
+    sys.exit(streamlit_cli.main())
+
+
+if __name__ == "__main__":
+    # Run with `python -m`, this module is __main__: register it under its own name
+    # so that the app's `utils.warmup` import shares the server start time
+    sys.modules.setdefault(__spec__.name, sys.modules[__name__])
+    main()